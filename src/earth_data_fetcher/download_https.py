@@ -1,9 +1,23 @@
+import asyncio
+import fnmatch
+import os
+import posixpath
+import re
+import threading
+import aiohttp
 import fsspec
+import fsspec.asyn
 import pandas as pd
 import xarray as xr
 
+from collections import defaultdict
+from functools import lru_cache
 from loguru import logger
-from typing import List, Tuple, Union, Callable
+from typing import Iterator, List, Sequence, Set, Tuple, Union, Callable
+from urllib.parse import urlsplit
+
+# filecache::[protocol]://[path that contains {t:...}]
+_FILECACHE_URL_RE = re.compile(r'^filecache::(http|https|ftp|sftp)+://.*\{t:.*\}.*')
 
 
 class DownloaderFsspec:
@@ -44,6 +58,16 @@ class DownloaderFsspec:
             setattr(self, key, value)
 
         self._kwargs = kwargs
+        self._listing_cache = {}
+        self._local_listing_cache = {}
+
+        # the path templates and format kwargs are fixed, so only prepare them once
+        # top level and metadata kwargs are passed to the path
+        self._fmt_kwargs = self._kwargs | self._kwargs.get('metadata', {})
+        self._remote_tmpl = url.replace('filecache::', '')
+        self._local_tmpl = self._kwargs.get('storage_options', {}).get('cache_storage', '')
+        self._format_paths = lru_cache(maxsize=4096)(self._format_paths)
+
         self._fs, self._url = self._get_fs(url)
         self._check_url_valid(url)
 
@@ -69,13 +93,10 @@ class DownloaderFsspec:
         None
             Returns None if the URL is valid.
         """
-        import re
-
         assert isinstance(url, str), "url must be a string"
         assert url != '', "url must be defined in the kwargs"
         
-        pattern = re.compile(r'(^filecache::)(http|https|ftp|sftp)+://.*({t:.*}).*')
-        assert pattern.match(url) is not None, "url must have the format filecache::[protocol]://[path that contains {t:...}]"
+        assert _FILECACHE_URL_RE.match(url) is not None, "url must have the format filecache::[protocol]://[path that contains {t:...}]"
 
     def _get_fs(self, url: str) -> Tuple[fsspec.AbstractFileSystem, str]:
         """
@@ -91,14 +112,50 @@ class DownloaderFsspec:
         Tuple[fsspec.AbstractFileSystem, str]
             A tuple containing the file system and the formatted URL.
         """
-        from copy import deepcopy
-
-        storage_options = deepcopy(self._kwargs.get('storage_options', {}))
+        storage_options = {**self._kwargs.get('storage_options', {})}
+        storage_options = self._add_http_pool_options(storage_options)
         
         fs, urlpath = fsspec.url_to_fs(url, **storage_options)
 
         return fs, urlpath
 
+    def _add_http_pool_options(self, storage_options: dict) -> dict:
+        """
+        Add the connection pool settings of the HTTP(S) session to the storage options.
+        fsspec already reuses one keep-alive session per filesystem, with aiohttp's
+        defaults of 100 connections and a 15 s keep-alive timeout. These can be changed
+        with the `http_connections` and `http_keepalive_timeout` kwargs. The options are
+        added under the protocol key, so that fsspec passes them on to the target
+        filesystem of the filecache.
+
+        Parameters
+        ----------
+        storage_options : dict
+            The storage options that are passed to fsspec.
+
+        Returns
+        -------
+        dict
+            The storage options with the connection pool settings for the protocol.
+        """
+        protocol = self.url.replace('filecache::', '').split('://')[0]
+        pool = {
+            'limit': self._kwargs.get('http_connections', None),
+            'keepalive_timeout': self._kwargs.get('http_keepalive_timeout', None)}
+        pool = {k: v for k, v in pool.items() if v is not None}
+        if len(pool) == 0 or protocol not in ('http', 'https'):
+            return storage_options
+
+        protocol_options = storage_options.get(protocol, {})
+        if protocol_options.get('get_client', _get_pooled_client) is not _get_pooled_client:
+            # a custom client would receive limit/keepalive_timeout as ClientSession kwargs
+            raise ValueError(
+                f"http_connections and http_keepalive_timeout cannot be used with "
+                f"storage_options.{protocol}.get_client, set the connector in get_client instead")
+        client_kwargs = dict(protocol_options.get('client_kwargs', {})) | pool
+        protocol_options = protocol_options | {'get_client': _get_pooled_client, 'client_kwargs': client_kwargs}
+        return storage_options | {protocol: protocol_options}
+
     def _make_path(self, t: pd.Timestamp, check_exists: bool = False) -> Tuple[Union[str, None], str]:
         """
         Construct the remote and local paths for the given time.
@@ -116,27 +173,44 @@ class DownloaderFsspec:
         Tuple[Union[str, None], str]
             A tuple containing the remote path (or None if it does not exist) and the local path.
         """
-        
-        # top level and metadata kwargs are passed to the path
-        fmt_kwargs = self._kwargs | self._kwargs.get('metadata', {})
-        remote = self.url.format(t=t, **fmt_kwargs).replace('filecache::', '')
-        remote = self._get_remote_path_if_exists(remote, prefix="filecache::", force_check=check_exists)
-
-        storage_options = self._kwargs.get('storage_options', {})
-        if storage_options == {}:
+        if self._kwargs.get('storage_options', {}) == {}:
             raise ValueError("storage_options must be defined in the kwargs")
-        local = storage_options.get('cache_storage', '').format(t=t, **fmt_kwargs)
+
+        remote, local = self._format_paths(t)
+        remote = self._get_remote_path_if_exists(remote, prefix="filecache::", force_check=check_exists, local=local)
         
         if local == '':
             raise ValueError("storage_options.cache_storage must be defined in the kwargs")
         
         logger.trace(f"Remote path: {remote}")
         return remote, local
+
+    def _format_paths(self, t: pd.Timestamp) -> Tuple[str, str]:
+        """
+        Format the remote and local path templates for the given time.
+        Wrapped with an lru_cache in __init__, so each time is only formatted once.
+
+        Parameters
+        ----------
+        t : pd.Timestamp
+            The time for which to format the paths.
+
+        Returns
+        -------
+        Tuple[str, str]
+            The remote path (without the filecache:: prefix) and the local path.
+        """
+        remote = self._remote_tmpl.format(t=t, **self._fmt_kwargs)
+        local = self._local_tmpl.format(t=t, **self._fmt_kwargs)
+        return remote, local
     
-    def _get_remote_path_if_exists(self, url: str, prefix: str = 'filecache::', force_check: bool = False) -> Union[str, None]:
+    def _get_remote_path_if_exists(self, url: str, prefix: str = 'filecache::', force_check: bool = False, local: Union[str, None] = None) -> Union[str, None]:
         """
         Check if the given URL exists in the file system and return the prefixed URL if it does.
         The method checks for the existence of the URL and can enforce a check if specified by force_check.
+        If the local folder is given and already contains the file, the remote is not checked.
+        This is not done for wildcard URLs, since a pattern in the file name cannot be
+        matched safely against a local folder that may hold the files of many remote folders.
 
         Parameters
         ----------
@@ -146,27 +220,196 @@ class DownloaderFsspec:
             The prefix to add to the URL if it exists, by default 'filecache::'.
         force_check : bool, optional
             Whether to force a check for the URL's existence, by default False.
+        local : Union[str, None], optional
+            The local folder that the URL is downloaded to, by default None.
 
         Returns
         -------
         Union[str, None]
             The prefixed URL if it exists, otherwise None.
         """
+        if force_check and ('*' not in url) and (local is not None):
+            if self._exists_locally(url, local):
+                logger.trace(f"Found {url} in local folder {local}")
+                return prefix + url
+
         if '*' in url:
-            flist = list(self._fs.glob(url))
+            parent, pattern = posixpath.split(url)
+            if '*' in parent:
+                flist = list(self._fs.glob(url))
+            else:
+                # many times share a parent, so filter the cached listing instead of globbing
+                names = sorted(fnmatch.filter(self._list_parent(parent), pattern))
+                flist = [posixpath.join(parent, name) for name in names]
             if len(flist) == 0:
                 return None
             else:
                 url = str(flist[0])
                 return prefix + url
         elif force_check:
-            if self._fs.exists(url):
+            found = self._bulk_exists([url])
+            if url in found or url in self._confirm_unlisted([url], found):
                 return prefix + url
             else:
                 return None
         else:
             return prefix + url
     
+    def _exists_locally(self, url: str, local: str) -> bool:
+        """
+        Check if the file of the URL is already in the local folder.
+        Only possible when files are cached with the same names as the remote.
+
+        Parameters
+        ----------
+        url : str
+            The URL without wildcards.
+        local : str
+            The local folder that the URL is downloaded to.
+
+        Returns
+        -------
+        bool
+            True if a file with the same name as the URL is in the local folder.
+        """
+        storage_options = self._kwargs.get('storage_options', {})
+        if not storage_options.get('same_names', True):
+            return False
+
+        if local not in self._local_listing_cache:
+            try:
+                with os.scandir(local) as entries:
+                    # skip partial downloads and the filecache metadata
+                    self._local_listing_cache[local] = {
+                        e.name for e in entries
+                        if e.is_file() and not e.name.endswith('.part') and e.name != 'cache'}
+            except FileNotFoundError:
+                self._local_listing_cache[local] = set()
+
+        return posixpath.basename(url) in self._local_listing_cache[local]
+
+    def _bulk_exists(self, urls: List[str]) -> Set[str]:
+        """
+        Check which of the given URLs exist on the remote file system.
+        URLs are grouped by their parent directory, so that a single listing
+        of each parent replaces one existence check per URL.
+
+        Parameters
+        ----------
+        urls : List[str]
+            The URLs to check (without the filecache:: prefix).
+
+        Returns
+        -------
+        Set[str]
+            The subset of URLs that exist.
+        """
+        groups = defaultdict(list)
+        for url in urls:
+            groups[posixpath.dirname(url)].append(url)
+
+        found = set()
+        unlisted = []
+        for parent, group in groups.items():
+            listing = self._list_parent(parent)
+            for url in group:
+                if '*' in url:
+                    if self._get_remote_path_if_exists(url, prefix='', force_check=True) is not None:
+                        found.add(url)
+                elif listing:
+                    if posixpath.basename(url) in listing:
+                        found.add(url)
+                else:
+                    # empty or failed listing, e.g. servers without directory index pages
+                    unlisted.append(url)
+
+        if len(unlisted) > 0:
+            exists = self._exists_many(unlisted)
+            found.update(url for url, ok in zip(unlisted, exists) if ok)
+
+        return found
+
+    def _confirm_unlisted(self, urls: List[str], found: Set[str]) -> Set[str]:
+        """
+        Check the URLs that were not in a listing of their parent with exists().
+        A listing can be incomplete (e.g. a landing page or a paginated index),
+        so a name missing from it does not prove that the file is missing.
+        URLs with an empty listing were already checked with exists() by _bulk_exists.
+
+        Parameters
+        ----------
+        urls : List[str]
+            The URLs that were passed to _bulk_exists (without the filecache:: prefix).
+        found : Set[str]
+            The URLs that _bulk_exists found.
+
+        Returns
+        -------
+        Set[str]
+            The URLs that exist even though they were not in the listing.
+        """
+        unlisted = [
+            url for url in urls
+            if url not in found and '*' not in url and self._list_parent(posixpath.dirname(url))]
+        if len(unlisted) == 0:
+            return set()
+
+        exists = self._exists_many(unlisted)
+        return {url for url, ok in zip(unlisted, exists) if ok}
+
+    def _exists_many(self, urls: List[str]) -> List[bool]:
+        """
+        Check the existence of several URLs with concurrent requests.
+        Async backends run all checks on the fsspec event loop, other
+        backends use a thread pool.
+
+        Parameters
+        ----------
+        urls : List[str]
+            The URLs to check (without the filecache:: prefix).
+
+        Returns
+        -------
+        List[bool]
+            Whether each URL exists, in the same order as urls.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        fs = getattr(self._fs, 'fs', self._fs)
+        if getattr(fs, 'async_impl', False):
+            async def exists_all():
+                return await asyncio.gather(*[fs._exists(url) for url in urls])
+            return list(fsspec.asyn.sync(fs.loop, exists_all))
+
+        max_workers = self._kwargs.get('max_workers', 16)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fs.exists, urls))
+
+    def _list_parent(self, parent: str) -> Set[str]:
+        """
+        List the file names in the given remote directory.
+        The listing is cached in self._listing_cache.
+
+        Parameters
+        ----------
+        parent : str
+            The remote directory to list.
+
+        Returns
+        -------
+        Set[str]
+            The names of the files in the directory, empty if it could not be listed.
+        """
+        if parent not in self._listing_cache:
+            try:
+                listing = self._fs.ls(parent, detail=False)
+            except Exception as e:
+                # not all servers support listing, the caller falls back to exists()
+                logger.trace(f"Could not list {parent}: {e}")
+                listing = []
+            self._listing_cache[parent] = {posixpath.basename(str(p).rstrip('/')) for p in listing}
+        return self._listing_cache[parent]
+
     def _make_times_strided(self, t0: pd.Timestamp, t1: pd.Timestamp) -> pd.DatetimeIndex:
         """
         Construct a list of times that are strided based on the given frequency.
@@ -203,6 +446,7 @@ class DownloaderFsspec:
     def _get_t0_for_strided_dates(self, t0: pd.Timestamp) -> pd.Timestamp:
         """
         Find the starting date for strided times based on the given time.
+        Dates whose file is already in the local folder are not checked on the remote.
 
         Parameters
         ----------
@@ -226,9 +470,21 @@ class DownloaderFsspec:
 
         dt = pd.to_timedelta(freq) * 2
         dates = pd.date_range(start=t0, end=t0 + dt, freq='1D')
-        for t in dates:
-            remote, _ = self._make_path(t, check_exists=True)
-            if remote is not None:
+
+        paths = [self._format_paths(t) for t in dates]
+        remotes = [remote for remote, _ in paths]
+        # a file that is already cached exists, so only the dates before it are checked remotely
+        first_local = next(
+            (i for i, (remote, local) in enumerate(paths) if '*' not in remote and self._exists_locally(remote, local)),
+            len(paths))
+        found = self._bulk_exists(remotes[:first_local])
+        # candidates before the first listed file could be missing from a partial listing
+        first = next((i for i, remote in enumerate(remotes) if remote in found), first_local)
+        found |= self._confirm_unlisted(remotes[:first], found)
+        if first_local < len(remotes):
+            found.add(remotes[first_local])
+        for t, remote in zip(dates, remotes):
+            if remote in found:
                 logger.debug(f"Found data at {t}")
                 return t
             else:
@@ -248,11 +504,28 @@ class DownloaderFsspec:
         Returns
         -------
         List[str]
-            A list of downloaded files.
+            A list of downloaded files, in the order of the batches.
         """
-        from copy import deepcopy
-        
-        storage_options = deepcopy(self._kwargs.get('storage_options'))
+        results = dict(self._iter_download_batches(batches))
+        return [f for local in batches for f in results[local]]
+
+    def _iter_download_batches(self, batches: dict) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Download batches of files and yield the local paths as each batch completes.
+
+        Parameters
+        ----------
+        batches : dict
+            A dictionary containing the batches to download.
+
+        Yields
+        ------
+        Tuple[str, List[str]]
+            The local folder of a batch and its downloaded files, in order of completion.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        storage_options = self._kwargs.get('storage_options')
         if storage_options is None:
             raise ValueError("storage_options must be defined in the kwargs")
 
@@ -260,19 +533,178 @@ class DownloaderFsspec:
         storage_default = {'same_names': True}
         # replace the default with the user-defined options
         storage_options = storage_default | storage_options
+        storage_options = self._add_http_pool_options(storage_options)
 
         n_local = len(batches.keys())
         n_remote = sum([len(v) for v in batches.values()])
         logger.info(f"Downloading {n_remote} files to {n_local} locations")
 
-        flist = []
-        for local in batches.keys():
-            urls = batches[local]
-            storage_options['cache_storage'] = local
-            flist += fsspec.open_local(urls, **storage_options)
-            logger.success(f"Fetched {len(urls)} files to {local}")
+        # async backends (e.g. http/https) can fetch all files from a single event loop,
+        # but that bypasses the filecache, so other filecache options (e.g. compression,
+        # expiry_time, check_files) still go through fsspec.open_local
+        target_fs = getattr(self._fs, 'fs', self._fs)
+        filecache_options = {k for k, v in storage_options.items() if not isinstance(v, dict)}
+        if (
+            storage_options['same_names']
+            and filecache_options <= {'cache_storage', 'same_names'}
+            and getattr(target_fs, 'async_impl', False)
+        ):
+            yield from self._iter_download_batches_async(target_fs, batches)
+            return
+
+        # one semaphore per host so that the number of concurrent connections
+        # to a single server can be capped independently of the thread pool
+        max_workers = self._kwargs.get('max_workers', 16)
+        max_host_connections = self._kwargs.get('max_host_connections', max_workers)
+        semaphores = {}
+        for urls in batches.values():
+            for host in {self._get_host(url) for url in urls}:
+                semaphores.setdefault(host, threading.Semaphore(max_host_connections))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for local, urls in batches.items():
+                # each batch gets its own dict, since the options are used concurrently
+                batch_options = {**storage_options, 'cache_storage': local}
+                semaphore = semaphores[self._get_host(urls[0])]
+                future = executor.submit(self._open_local, urls, semaphore, **batch_options)
+                futures[future] = local
+
+            try:
+                for future in as_completed(futures):
+                    local = futures[future]
+                    files = future.result()
+                    logger.success(f"Fetched {len(files)} files to {local}")
+                    yield local, files
+            finally:
+                # do not start the remaining batches if the consumer stops early
+                for future in futures:
+                    future.cancel()
+
+    def _iter_download_batches_async(self, fs: fsspec.asyn.AsyncFileSystem, batches: dict) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Download batches of files concurrently with the coroutines of an async filesystem.
+        All batches run on fsspec's event loop at the same time, sharing a limit of
+        `max_concurrency` (default 32) concurrent requests. Files that already exist
+        locally are not downloaded again.
+
+        Parameters
+        ----------
+        fs : fsspec.asyn.AsyncFileSystem
+            The target filesystem of the filecache.
+        batches : dict
+            A dictionary containing the batches to download.
+
+        Yields
+        ------
+        Tuple[str, List[str]]
+            The local folder of a batch and its files, in order of completion.
+        """
+        from concurrent.futures import as_completed
+
+        semaphore = asyncio.Semaphore(self._kwargs.get('max_concurrency', 32))
+
+        futures = {}
+        try:
+            for local, urls in batches.items():
+                rpaths = [url.replace('filecache::', '') for url in urls]
+                lpaths = [os.path.join(local, posixpath.basename(rpath)) for rpath in rpaths]
+                missing = [(r, l) for r, l in zip(rpaths, lpaths) if not os.path.exists(l)]
+                if len(missing) > 0:
+                    os.makedirs(local, exist_ok=True)
+                coro = self._get_files_async(fs, [r for r, _ in missing], [l for _, l in missing], semaphore)
+                future = asyncio.run_coroutine_threadsafe(coro, fs.loop)
+                futures[future] = (local, lpaths, len(missing))
+
+            for future in as_completed(futures):
+                future.result()
+                local, lpaths, n_missing = futures[future]
+                logger.success(f"Fetched {n_missing} files to {local}")
+                yield local, lpaths
+        finally:
+            # stop the remaining batches on a failure or if the consumer stops early
+            for future in futures:
+                future.cancel()
+
+    @staticmethod
+    async def _get_files_async(fs: fsspec.asyn.AsyncFileSystem, rpaths: List[str], lpaths: List[str], semaphore: asyncio.Semaphore) -> None:
+        """
+        Download files with fs._get_file, with the number of concurrent requests
+        limited by a semaphore that is shared between batches.
+        Files are written to a temporary name first, so that interrupted downloads
+        are not mistaken for complete files.
+
+        Parameters
+        ----------
+        fs : fsspec.asyn.AsyncFileSystem
+            The filesystem to download from.
+        rpaths : List[str]
+            The remote paths.
+        lpaths : List[str]
+            The local paths, in the same order as rpaths.
+        semaphore : asyncio.Semaphore
+            The semaphore that limits the number of concurrent downloads.
+        """
+        async def get_file(rpath: str, lpath: str) -> None:
+            async with semaphore:
+                try:
+                    await fs._get_file(rpath, lpath + '.part')
+                except BaseException:
+                    # also runs when the download is cancelled
+                    if os.path.exists(lpath + '.part'):
+                        os.remove(lpath + '.part')
+                    raise
+            os.replace(lpath + '.part', lpath)
+            logger.trace(f"Downloaded {rpath} to {lpath}")
+
+        tasks = [asyncio.ensure_future(get_file(r, l)) for r, l in zip(rpaths, lpaths)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # stop the other downloads on the first failure, instead of letting
+            # them run on fsspec's loop after the error has been raised
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def _open_local(self, urls: Sequence[str], semaphore: threading.Semaphore, **storage_options) -> List[str]:
+        """
+        Download a single batch of files with fsspec while holding the host semaphore.
+
+        Parameters
+        ----------
+        urls : Sequence[str]
+            The remote URLs (with the filecache:: prefix) to download.
+        semaphore : threading.Semaphore
+            The semaphore that limits the number of concurrent connections to the host.
+        **storage_options
+            The storage options passed to fsspec.open_local.
+
+        Returns
+        -------
+        List[str]
+            A list of downloaded files.
+        """
+        with semaphore:
+            return fsspec.open_local(list(urls), **storage_options)
+
+    @staticmethod
+    def _get_host(url: str) -> str:
+        """
+        Get the host name of a URL, ignoring the filecache:: prefix.
+
+        Parameters
+        ----------
+        url : str
+            The URL to get the host from.
 
-        return flist
+        Returns
+        -------
+        str
+            The host name of the URL.
+        """
+        return urlsplit(url.replace('filecache::', '')).netloc
     
     def _make_batch(self, times: Union[str, pd.Timestamp, List[pd.Timestamp], pd.DatetimeIndex]) -> dict:
         """
@@ -289,8 +721,6 @@ class DownloaderFsspec:
         dict
             A dictionary containing the batches to download, with folder paths as keys.
         """
-        from collections import defaultdict
-
         if isinstance(times, str):
             times = [pd.Timestamp(times)]
         elif isinstance(times, pd.Timestamp):
@@ -305,20 +735,66 @@ class DownloaderFsspec:
         times = self._make_times_strided(times[0], times[-1])
 
         logger.debug("Making folder-batches for download")
-        batch = defaultdict(tuple)
+        batch = defaultdict(list)
         for t in times:
             remote, local = self._make_path(t)
             if remote is not None:
-                batch[local] = batch[local] + (remote,)
+                batch[local].append(remote)
 
         batch = dict(batch)
 
         return batch
     
-    def download(self, times: Union[str, pd.Timestamp, List[pd.Timestamp]]) -> List[str]:
+    def download_iter(self, times: Union[str, pd.Timestamp, List[pd.Timestamp]]) -> Iterator[str]:
+        """
+        Download files based on the provided times and yield each file once it is available.
+        Files can be processed while the remaining batches are still downloading.
+
+        Parameters
+        ----------
+        times : Union[str, pd.Timestamp, List[pd.Timestamp]]
+            The times for which to download files.
+
+        Yields
+        ------
+        str
+            The local path of a downloaded file.
+        """
+        try:
+            batch = self._make_batch(times)
+            for _, files in self._iter_download_batches(batch):
+                yield from files
+        finally:
+            # the listings are only valid for the duration of a download
+            self._listing_cache.clear()
+            self._local_listing_cache.clear()
+
+    def download_all(self, times: Union[str, pd.Timestamp, List[pd.Timestamp]]) -> List[str]:
         """
         Download files based on the provided times.
 
+        Parameters
+        ----------
+        times : Union[str, pd.Timestamp, List[pd.Timestamp]]
+            The times for which to download files.
+
+        Returns
+        -------
+        List[str]
+            A list of downloaded files, in the order of the times.
+        """
+        try:
+            batch = self._make_batch(times)
+            return self._download_batches(batch)
+        finally:
+            # the listings are only valid for the duration of a download
+            self._listing_cache.clear()
+            self._local_listing_cache.clear()
+
+    def download(self, times: Union[str, pd.Timestamp, List[pd.Timestamp]]) -> List[str]:
+        """
+        Download files based on the provided times. Same as download_all.
+
         Parameters
         ----------
         times : Union[str, pd.Timestamp, List[pd.Timestamp]]
@@ -329,6 +805,26 @@ class DownloaderFsspec:
         List[str]
             A list of downloaded files.
         """
-        batch = self._make_batch(times)
-        flist = self._download_batches(batch)
-        return flist
\ No newline at end of file
+        return self.download_all(times)
+
+
+async def _get_pooled_client(limit: int = 100, keepalive_timeout: float = 15, **kwargs) -> aiohttp.ClientSession:
+    """
+    Create an aiohttp session with the given connection pool settings.
+
+    Parameters
+    ----------
+    limit : int, optional
+        The maximum number of simultaneous connections, by default 100 (aiohttp's default).
+    keepalive_timeout : float, optional
+        The number of seconds that idle connections are kept open, by default 15 (aiohttp's default).
+    **kwargs
+        Keyword arguments passed to aiohttp.ClientSession by fsspec.
+
+    Returns
+    -------
+    aiohttp.ClientSession
+        The session used by fsspec's HTTPFileSystem.
+    """
+    connector = aiohttp.TCPConnector(limit=limit, keepalive_timeout=keepalive_timeout)
+    return aiohttp.ClientSession(connector=connector, **kwargs)
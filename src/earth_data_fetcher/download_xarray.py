@@ -1,9 +1,19 @@
+import os
 import pathlib
+import threading
+import numpy as np
 import pandas as pd
 import xarray as xr
 
+from collections import ChainMap
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cache
 from loguru import logger
-from typing import List, Union, Callable
+from typing import List, Tuple, Union, Callable
+
+# netCDF-C is not thread-safe, so files written with netcdf4 are written one at a time
+_NETCDF4_LOCK = threading.Lock()
 
 
 class DownloaderXarray:
@@ -38,6 +48,8 @@ class DownloaderXarray:
         """
         self.data_opener = data_opener
         self._kwargs = kwargs
+        # top level and metadata kwargs are passed to the path
+        self._fmt_kwargs = self._kwargs | self._kwargs.get('metadata', {})
 
         self._check_cache_storage_path_valid()
         self._data = None
@@ -74,10 +86,11 @@ class DownloaderXarray:
         assert '{t:' in fname, "storage_options.cache_storage must contain '{t:...}'"
 
         dates = pd.date_range('2000-01-01', '2000-01-09', freq='1D')
-        # top level and metadata kwargs are passed to the path
-        fmt_kwargs = self._kwargs | self._kwargs.get('metadata', {}) 
-        flist = set([fname.format(t=t, **fmt_kwargs) for t in dates])
-        assert len(flist) == len(dates), "storage_options.cache_storage must return a unique file for each day"
+        seen = set()
+        for t in dates:
+            fname_t = fname.format_map(ChainMap({'t': t}, self._fmt_kwargs))
+            assert fname_t not in seen, "storage_options.cache_storage must return a unique file for each day"
+            seen.add(fname_t)
         logger.trace("Cache storage path is valid")
         
     def _make_local_path(self, t:pd.Timestamp)->pathlib.Path:
@@ -99,9 +112,7 @@ class DownloaderXarray:
         if storage_options == {}:
             raise ValueError("storage_options must be defined in the kwargs")
         fname = storage_options.get('cache_storage', '')
-        # top level and metadata kwargs are passed to the path
-        fmt_kwargs = self._kwargs | self._kwargs.get('metadata', {})  
-        fname = fname.format(t=t, **fmt_kwargs)
+        fname = fname.format(t=t, **self._fmt_kwargs)
         
         if fname == '':
             raise ValueError("storage_options.cache_storage must be defined in the kwargs")
@@ -120,39 +131,212 @@ class DownloaderXarray:
             self._data = self._data_all_vars[vars]
         return self._data
     
-    def _get_data(self, t:pd.Timestamp)->xr.Dataset:
-        assert isinstance(t, pd.Timestamp), "t must be a pd.Timestamp"
-        
-        ds = self.data.sel(time=[t], method='nearest')
-        
-        return ds
-    
-    def _download_single_timestep(self, t:pd.Timestamp)->str:
-        self._previous_fname = ''
-        ds = self._get_data(t)
+    def _get_encoding(self, ds:xr.Dataset)->Tuple[dict, str]:
+        """
+        Get the netCDF encoding and engine for the compression set in the kwargs.
+
+        The compression is set with the `compression` kwarg (default: 'zlib'):
+        - 'zlib': gzip compression with h5netcdf (single-threaded, always available)
+        - 'zstd': Zstandard compression with netcdf4 (requires netCDF-C >= 4.9)
+        - 'blosc': Blosc2 with the zstd codec and h5netcdf (requires hdf5plugin)
+
+        The compression level can be set with the `complevel` kwarg.
+        If `quantize` is set, float variables are packed to int16 with
+        scale_factor/add_offset. The encoding of each variable can be
+        overridden with `encoding_overrides` ({variable: {key: value}}).
+
+        Parameters
+        ----------
+        ds : xr.Dataset
+            The dataset that will be written
+
+        Returns
+        -------
+        Tuple[dict, str]
+            The encoding for each data variable and the engine for to_netcdf
+
+        Raises
+        ------
+        ValueError
+            If the compression is not supported
+        """
+        compression = self._kwargs.get('compression', 'zlib')
+        complevel = self._kwargs.get('complevel', None)
+
+        if compression == 'zlib':
+            compress = dict(zlib=True)
+            if complevel is not None:
+                compress['complevel'] = complevel
+            engine = 'h5netcdf'
+        elif compression == 'zstd':
+            compress = dict(compression='zstd', complevel=3 if complevel is None else complevel, shuffle=True)
+            engine = 'netcdf4'
+        elif compression == 'blosc':
+            import hdf5plugin  # registers the filter with HDF5
+
+            blosc = hdf5plugin.Blosc2(cname='zstd', clevel=3 if complevel is None else complevel, filters=hdf5plugin.Blosc2.SHUFFLE)
+            compress = dict(blosc)
+            engine = 'h5netcdf'
+        else:
+            raise ValueError(f"compression must be one of 'zlib', 'zstd' or 'blosc', got {compression}")
+
+        compress['dtype'] = 'float32'
+        chunks = self._get_chunks(ds)
+        encoding = {k: compress | self._get_chunksizes(ds[k], chunks) for k in ds.data_vars}
+
+        if self._kwargs.get('quantize', False):
+            encoding = {k: encoding[k] | self._get_quantize_encoding(ds[k]) for k in ds.data_vars}
+
+        # user-defined encoding per variable takes precedence
+        overrides = self._kwargs.get('encoding_overrides', {})
+        encoding = {k: v | dict(overrides.get(k, {})) for k, v in encoding.items()}
+
+        return encoding, engine
+
+    def _get_chunks(self, ds:xr.Dataset)->dict:
+        """
+        Get the netCDF chunk sizes used to write a time step.
+
+        The two trailing (spatial) dimensions of each variable are split into chunks
+        of at most 512, so that every chunk is compressed and written while it fits
+        in the CPU cache. All other dimensions have a chunk size of 1. The chunks
+        can be overridden with the `chunks` kwarg ({dimension: size}).
+
+        Parameters
+        ----------
+        ds : xr.Dataset
+            The dataset that will be written
+
+        Returns
+        -------
+        dict
+            The chunk size for each dimension
+        """
+        chunks = {dim: 1 for dim in ds.dims}
+        for da in ds.data_vars.values():
+            for dim in da.dims[-2:]:
+                if dim != 'time':
+                    chunks[dim] = min(ds.sizes[dim], 512)
+
+        return chunks | dict(self._kwargs.get('chunks', {}))
+
+    @staticmethod
+    def _get_chunksizes(da:xr.DataArray, chunks:dict)->dict:
+        """
+        Get the netCDF chunksizes encoding of a variable.
+
+        Parameters
+        ----------
+        da : xr.DataArray
+            The variable that will be written
+        chunks : dict
+            The chunk size for each dimension, see `_get_chunks`
+
+        Returns
+        -------
+        dict
+            The chunksizes encoding, or an empty dict for scalar variables
+        """
+        if da.ndim == 0:
+            return {}
+        return dict(chunksizes=tuple(min(chunks[dim], da.sizes[dim]) for dim in da.dims))
+
+    @staticmethod
+    def _get_quantize_encoding(da:xr.DataArray)->dict:
+        """
+        Get the CF-compliant int16 packing (scale_factor and add_offset) for a variable.
+
+        The range of the data is mapped onto [-32767, 32767], with -32768 reserved
+        as the fill value. Non-float variables, variables without valid data and
+        variables whose range is too narrow for float32 attributes are not packed.
+
+        Parameters
+        ----------
+        da : xr.DataArray
+            The variable that will be written
+
+        Returns
+        -------
+        dict
+            The packing encoding, or an empty dict if the variable is not packed
+        """
+        if not np.issubdtype(da.dtype, np.floating):
+            return {}
+
+        vmin, vmax = float(da.min()), float(da.max())
+        if np.isnan(vmin) or np.isnan(vmax):
+            return {}
+
+        # float32 packing attributes, otherwise CF decoding promotes the data to float64
+        # (a constant field would give scale_factor=0)
+        scale = np.float32((vmax - vmin) / 65534 if vmax > vmin else 1.0)
+        offset = np.float32((vmax + vmin) / 2)
+
+        # a range below the float32 precision of the offset cannot be packed
+        if scale < np.spacing(offset):
+            return {}
+        # the rounded attributes must still map the range onto the int16 codes
+        codes = np.round((np.array([vmin, vmax]) - float(offset)) / float(scale))
+        if np.any(np.abs(codes) > 32767):
+            return {}
+
+        return dict(dtype='int16', _FillValue=-32768, scale_factor=scale, add_offset=offset)
+
+    def _save_timestep(self, ds:xr.Dataset, fname:pathlib.Path)->None:
+        """
+        Download the data of a single time step and save it to a netCDF file.
+
+        Parameters
+        ----------
+        ds : xr.Dataset
+            The (lazy) data of the time step
+        fname : pathlib.Path
+            The path of the output file
+        """
         t_out = ds.time.to_index()[0]
 
-        fname = self._make_local_path(t_out)
-        if fname.exists() and (fname != self._previous_fname):
-            logger.debug(f"File {fname} already exists")
+        logger.debug(f"Downloading {t_out} to {fname}")
+        if self._kwargs.get('quantize', False):
+            # the packing needs the range of the data, so read it once up front
+            logger.trace("Downloading data with load() to compute the value range")
+            ds = ds.load()
+        if not ds.chunks:
+            # read each variable in a single request, the netCDF chunking is only
+            # applied on write, as smaller dask chunks are separate remote requests
+            ds = ds.chunk()
+
+        logger.debug(f"Saving data to {fname}")
+        encoding, engine = self._get_encoding(ds)
+        fname.parent.mkdir(parents=True, exist_ok=True)
+
+        # the time steps are already written in parallel, so share the CPUs between them
+        max_workers = self._kwargs.get('max_workers', 4)
+        num_workers = self._kwargs.get('num_workers', max(1, (os.cpu_count() or 1) // max_workers))
+        if engine == 'netcdf4':
+            # xarray only locks the chunk writes, not the file and variable creation,
+            # so read the data in parallel and write the file under a global lock
+            ds = ds.load(scheduler='threads', num_workers=num_workers)
+            lock = _NETCDF4_LOCK
         else:
-            logger.debug(f"Downloading {t_out} to {fname}")
-            logger.trace("Downloading data with compute()")
-            ds = ds.compute()
-            
-            logger.debug(f"Saving data to {fname}")
-            compress = dict(zlib=True, dtype='float32')
-            fname.parent.mkdir(parents=True, exist_ok=True)
-
-            ds.to_netcdf(
-                path=fname, 
-                encoding={k: compress for k in ds.data_vars}, 
-                engine='h5netcdf')
-            
-            logger.success(f"Downloaded {t_out} to {fname}")
-
-        self._previous_fname = fname
-        return str(fname)
+            lock = nullcontext()
+
+        # write to a temporary name, since a failed remote read would otherwise
+        # leave a partial file that is taken as complete on the next download
+        part = fname.with_name(fname.name + '.part')
+        try:
+            with lock:
+                delayed = ds.to_netcdf(
+                    path=part, 
+                    encoding=encoding, 
+                    engine=engine,
+                    compute=False)
+                delayed.compute(scheduler='threads', num_workers=num_workers)
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+        os.replace(part, fname)
+        
+        logger.success(f"Downloaded {t_out} to {fname}")
 
     def download(self, times: Union[str, pd.Timestamp, pd.DatetimeIndex, List[pd.Timestamp]])->List[str]:
         """
@@ -186,14 +370,55 @@ class DownloaderXarray:
         else:
             raise ValueError("times must be a string, a pd.Timestamp or a list of pd.Timestamp")
         
-        flist = []
-        for t in times:
-            fname = self._download_single_timestep(t)
-            flist.append(fname)
+        # skip the remote time lookup for times whose file is already there
+        fnames = [self._make_local_path(t) for t in times]
+        missing = [i for i, fname in enumerate(fnames) if not fname.exists()]
+        logger.debug(f"{len(fnames) - len(missing)} of {len(fnames)} files already exist")
+
+        # several times can map to the same time step (e.g. daily times for 8-day data),
+        # so the file names are resolved first and each file is only written once
+        to_download = {}
+        if len(missing) > 0:
+            # a single nearest lookup for all times instead of a .sel per time
+            index = self.data.indexes['time']
+            positions = index.get_indexer(pd.DatetimeIndex([times[i] for i in missing]), method='nearest')
+            for i, pos in zip(missing, positions):
+                fname = self._make_local_path(index[pos])
+                fnames[i] = fname
+                if fname.exists():
+                    logger.debug(f"File {fname} already exists")
+                elif fname not in to_download:
+                    to_download[fname] = self.data.isel(time=[pos])
+        flist = [str(fname) for fname in fnames]
+
+        # reading the next time steps overlaps with writing the previous ones
+        max_workers = self._kwargs.get('max_workers', 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._save_timestep, ds, fname) for fname, ds in to_download.items()]
+            for future in as_completed(futures):
+                future.result()
         
         return flist
     
 
+@cache
+def _copernicusmarine():
+    """Import copernicusmarine on first use, since the import is slow"""
+    import copernicusmarine
+
+    return copernicusmarine
+
+
+@cache
+def _get_env() -> dict:
+    """Read the credentials from the .env file once"""
+    import dotenv
+
+    if not dotenv.load_dotenv():
+        raise ValueError("No .env file found. Please create `.env` file in project root")
+    return dotenv.dotenv_values()
+
+
 def pydap_opener(url: str) -> xr.Dataset:
     """
     Open a dataset with pydap.
@@ -225,15 +450,9 @@ def cmems_opener(url: str) -> xr.Dataset:
     xr.Dataset
         The dataset
     """
-    import copernicusmarine as cm
-    import dotenv
-
-    if not dotenv.load_dotenv():
-        raise ValueError("No .env file found. Please create `.env` file in project root")
-    else:
-        env = dotenv.dotenv_values()
+    env = _get_env()
 
-    ds = cm.open_dataset(
+    ds = _copernicusmarine().open_dataset(
         username=env['COPERNICUSMARINE_SERVICE_USERNAME'],
         password=env['COPERNICUSMARINE_SERVICE_PASSWORD'],
         dataset_id=url,
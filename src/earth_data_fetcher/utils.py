@@ -1,17 +1,24 @@
 # reads files like data/sources.yaml to the munch data type
 import munch
 from .download_xarray import DownloaderXarray
-from .download_https import DownloaderFsspec
+from .download_https import DownloaderFsspec, _FILECACHE_URL_RE
+from functools import cache
 from typing import Union
 from loguru import logger
 
 
-def read_sources(fname_yaml:str)->munch.Munch:
-    """Reads a yaml file and returns a munch data type"""
+@cache
+def _yaml():
+    """Import yaml on first use"""
     import yaml
 
+    return yaml
+
+
+def read_sources(fname_yaml:str)->munch.Munch:
+    """Reads a yaml file and returns a munch data type"""
     with open(fname_yaml, 'r') as f:
-        sources = munch.munchify(yaml.safe_load(f))
+        sources = munch.munchify(_yaml().safe_load(f))
     return sources  # type: ignore
 
 
@@ -39,7 +46,6 @@ def make_downloader(config:dict)->Union[DownloaderFsspec, DownloaderXarray]:
     TypeError
         If the URL is not compatible with any known downloader
     """
-    import re
     from .download_xarray import cmems_opener, pydap_opener
 
     if 'url' not in config:
@@ -47,8 +53,7 @@ def make_downloader(config:dict)->Union[DownloaderFsspec, DownloaderXarray]:
     if 'storage_options' not in config:
         raise ValueError("config must contain the key 'storage_options'")
     
-    protocol_pattern = re.compile(r'filecache::(http|https|ftp|sftp)+://.*({t:.*}).*')
-    is_fsspec_compatible = re.match(protocol_pattern, config['url']) is not None
+    is_fsspec_compatible = _FILECACHE_URL_RE.match(config['url']) is not None
     is_thredds_compatible = 'thredds' in config['url']
     is_cmems_dataset = '/' not in config['url']
 